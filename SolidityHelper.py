@@ -1,17 +1,56 @@
+from enum import IntEnum
+from functools import cached_property
 from typing import Optional, Iterator, List, Dict
 
-import docker, json
-import os, subprocess
+import docker, json, sys
+import os
 from pathlib import Path
-import hashlib
+from Crypto.Hash import keccak
 from eth_abi import encode as abi_encode
 import tempfile
 import shutil
 
+try:
+    import orjson
+except ImportError:  # orjson не установлен — используем стандартный json
+    orjson = None
+
+_keccak_new = keccak.new
+
+
+def keccak256_bytes(data: bytes) -> bytes:
+    """Keccak256 в виде 32 байт"""
+    k = _keccak_new(digest_bits=256)
+    k.update(data)
+    return k.digest()
+
+
+def keccak256_many(messages) -> List[bytes]:
+    """Keccak256 для набора сообщений за один вызов (в порядке следования)"""
+    new = _keccak_new
+    return [new(data=m, digest_bits=256).digest() for m in messages]
+
 
 def keccak256(data: str) -> str:
     """Keccak256 в hex-строке"""
-    return "0x" + hashlib.sha3_256(data.encode()).hexdigest()
+    return "0x" + keccak256_bytes(data.encode()).hex()
+
+
+def _json_dumps(obj) -> str:
+    """Компактная сериализация в JSON-строку (orjson, если доступен)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def _json_loads(data):
+    """Разбор JSON из str/bytes (orjson, если доступен)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+_EMPTY: tuple = ()
 
 
 class ABIType:
@@ -19,47 +58,70 @@ class ABIType:
     Представляет тип параметра ABI (включая tuple/tuple[] и вложенные структуры).
     """
 
+    __slots__ = ("raw", "components", "is_tuple", "canonical_type", "_suffix")
+
     def __init__(self, type_str: str, components: list = None, is_input=True):
-        self.raw = type_str  # строка типа из ABI: "uint256", "tuple", "tuple[]"
-        self.components = [
-            (ABIInput if is_input else ABIOutput)(
-                c.get("name", ""),
-                c["type"],
-                c.get("indexed", False),
-                c.get("components")
+        self.raw = sys.intern(type_str)  # строка типа из ABI: "uint256", "tuple", "tuple[]"
+        self.is_tuple: bool = type_str.startswith("tuple")
+        self._suffix: str = type_str[5:] if self.is_tuple else ""  # "", "[]" или "[N]"
+        if not components:
+            self.components = _EMPTY
+        elif is_input:
+            self.components = tuple(
+                ABIInput(c.get("name", ""), c["type"], c.get("indexed", False), c.get("components"))
+                for c in components
             )
-            for c in (components or [])
-        ]
+        else:
+            self.components = tuple(
+                ABIOutput(c.get("name", ""), c["type"], c.get("components"))
+                for c in components
+            )
+        # для примитивов это тот же интернированный объект, что и raw
+        self.canonical_type: str = sys.intern(self._compute_canonical())
+
+    @classmethod
+    def get(cls, type_str: str, components: list = None, is_input=True) -> "ABIType":
+        """
+        Возвращает ABIType для параметра. Примитивные типы (без компонентов)
+        неизменяемы, поэтому один экземпляр разделяется всеми параметрами.
+        """
+        if components or type_str.startswith("tuple"):
+            return cls(type_str, components, is_input)
+        cached = _PRIMITIVE_TYPE_CACHE.get(type_str)
+        if cached is None:
+            cached = _PRIMITIVE_TYPE_CACHE[type_str] = cls(type_str)
+        return cached
 
     def __repr__(self):
         if self.is_tuple:
             return f"({', '.join(map(str, self.components))})"
         return self.raw
 
-    @property
-    def is_tuple(self) -> bool:
-        return self.raw.startswith("tuple")
-
-    @property
-    def canonical_type(self) -> str:
+    def _compute_canonical(self) -> str:
         """
         Возвращает каноническое строковое представление для сигнатуры.
         tuple → (типы компонентов)
         tuple[] → (типы компонентов)[]
+        Вычисляется один раз при создании: raw/components после этого не меняются.
         """
         if self.is_tuple:
-            inner = ",".join(c.type.canonical_type for c in self.components)
-            suffix = self.raw[5:]  # [] если это tuple[]
-            return f"({inner}){suffix}"
+            # компоненты уже построены и хранят свои строки — рекурсивного обхода нет
+            inner = ",".join([c.type.canonical_type for c in self.components])
+            return f"({inner}){self._suffix}"
         return self.raw
 
 
+_PRIMITIVE_TYPE_CACHE: Dict[str, ABIType] = {}
+
+
 class ABIParameter:
     """Базовый параметр ABI"""
 
+    __slots__ = ("name", "type")
+
     def __init__(self, name: str, type_: str, components=None):
         self.name = name
-        self.type = ABIType(type_, components, is_input=self.__class__ is ABIInput)
+        self.type = ABIType.get(type_, components, is_input=self.__class__ is ABIInput)
 
     def __repr__(self):
         return f"{self.type.canonical_type} {self.name}".strip()
@@ -67,6 +129,9 @@ class ABIParameter:
 
 class ABIInput(ABIParameter):
     """Входной параметр функции/события"""
+
+    __slots__ = ("indexed",)
+
     def __init__(self, name, type_: str, indexed=False, components=None):
         super().__init__(name, type_, components)
         self.indexed = indexed
@@ -74,17 +139,44 @@ class ABIInput(ABIParameter):
 
 class ABIOutput(ABIParameter):
     """Выходной параметр функции"""
+
+    __slots__ = ()
+
     def __init__(self, name, type_: str, components=None):
         super().__init__(name, type_, components)
 
 
+class EntryKind(IntEnum):
+    """Вид элемента ABI; сравнивается как int, а не как строка"""
+    OTHER = 0
+    FUNCTION = 1
+    EVENT = 2
+    ERROR = 3
+    CONSTRUCTOR = 4
+    FALLBACK = 5
+    RECEIVE = 6
+
+
 class ABIEntry:
     """Базовый класс для элементов ABI."""
 
-    def __init__(self, name, inputs, entry_type):
+    __slots__ = ("name", "inputs", "kind", "_type_name", "_signature", "_selector")
+
+    def __init__(self, name, inputs, kind: EntryKind, type_name: Optional[str] = None):
         self.name = name
         self.inputs: list[ABIInput] = inputs
-        self.entry_type = entry_type
+        self.kind = kind
+        # исходная строка типа для записей, которых нет в EntryKind
+        self._type_name = type_name
+        self._signature: Optional[str] = None
+        self._selector: Optional[bytes] = None
+
+    @property
+    def entry_type(self) -> str:
+        """Строковый тип элемента, как в ABI ("function", "event", ...)"""
+        if self.kind is EntryKind.OTHER:
+            return self._type_name
+        return self.kind.name.lower()
 
     @property
     def signature(self):
@@ -94,48 +186,88 @@ class ABIEntry:
 class FunctionABI(ABIEntry):
     """Функция контракта."""
 
-    def __init__(self, name, inputs, outputs, state_mutability):
-        super().__init__(name, inputs, "function")
-        self.outputs: list[ABIOutput] = outputs
+    __slots__ = ("state_mutability", "_raw_outputs", "_outputs", "_encode_types")
+
+    def __init__(self, name, inputs, raw_outputs, state_mutability):
+        super().__init__(name, inputs, EntryKind.FUNCTION)
+        # выходные параметры разбираются только при обращении к .outputs
+        self._raw_outputs = raw_outputs
+        self._outputs: Optional[list[ABIOutput]] = None
         self.state_mutability = state_mutability
+        # eth_abi ожидает строки типов — собираем их один раз
+        self._encode_types: List[str] = [inp.type.canonical_type for inp in inputs]
+
+    @property
+    def outputs(self) -> list[ABIOutput]:
+        if self._outputs is None:
+            self._outputs = [
+                ABIOutput(o.get("name", ""), o["type"], o.get("components"))
+                for o in self._raw_outputs
+            ]
+        return self._outputs
 
     @property
     def signature(self):
-        types = ",".join(inp.type.canonical_type for inp in self.inputs)
-        return f"{self.name}({types})"
+        if self._signature is None:
+            types = ",".join(inp.type.canonical_type for inp in self.inputs)
+            self._signature = f"{self.name}({types})"
+        return self._signature
 
     @property
-    def selector(self):
-        return keccak256(self.signature)[:8]
+    def selector(self) -> bytes:
+        """Первые 4 байта keccak256 от сигнатуры"""
+        if self._selector is None:
+            self._selector = keccak256_bytes(self.signature.encode())[:4]
+        return self._selector
+
+    @property
+    def selector_hex(self) -> str:
+        return "0x" + self.selector.hex()
+
+    def encode_abi(self, args) -> bytes:
+        """Calldata: селектор + закодированные аргументы"""
+        return self.selector + abi_encode(self._encode_types, args)
 
-    def encode_abi(self, args):
-        types = [inp.type for inp in self.inputs]
-        encoded_args = abi_encode(types, args)
-        return self.selector + encoded_args.hex()
+    def encode_abi_hex(self, args) -> str:
+        """Calldata в виде hex-строки "0x..." (одно преобразование всего буфера)"""
+        return "0x" + self.encode_abi(args).hex()
 
 
 class EventABI(ABIEntry):
     """Событие контракта."""
 
+    __slots__ = ("anonymous",)
+
     def __init__(self, name, inputs, anonymous=False):
-        super().__init__(name, inputs, "event")
+        super().__init__(name, inputs, EntryKind.EVENT)
         self.anonymous = anonymous
 
     @property
     def signature(self):
-        types = ",".join(inp.type.canonical_type for inp in self.inputs)
-        return f"{self.name}({types})"
+        if self._signature is None:
+            types = ",".join(inp.type.canonical_type for inp in self.inputs)
+            self._signature = f"{self.name}({types})"
+        return self._signature
+
+    @property
+    def selector(self) -> bytes:
+        """keccak256 от сигнатуры (topic0)"""
+        if self._selector is None:
+            self._selector = keccak256_bytes(self.signature.encode())
+        return self._selector
 
     @property
-    def selector(self):
-        return keccak256(self.signature)
+    def selector_hex(self) -> str:
+        return "0x" + self.selector.hex()
 
 
 class ConstructorABI(ABIEntry):
     """Конструктор контракта."""
 
+    __slots__ = ("state_mutability",)
+
     def __init__(self, inputs, state_mutability="nonpayable"):
-        super().__init__("", inputs, "constructor")
+        super().__init__("", inputs, EntryKind.CONSTRUCTOR)
         self.state_mutability = state_mutability
 
     @property
@@ -146,58 +278,84 @@ class ConstructorABI(ABIEntry):
 class ErrorABI(ABIEntry):
     """Пользовательская ошибка."""
 
+    __slots__ = ()
+
     def __init__(self, name, inputs):
-        super().__init__(name, inputs, "error")
+        super().__init__(name, inputs, EntryKind.ERROR)
 
     @property
     def signature(self):
-        types = ",".join(inp.type.canonical_type for inp in self.inputs)
-        return f"{self.name}({types})"
+        if self._signature is None:
+            types = ",".join(inp.type.canonical_type for inp in self.inputs)
+            self._signature = f"{self.name}({types})"
+        return self._signature
 
     @property
-    def selector(self):
-        return keccak256(self.signature)[:10]
+    def selector(self) -> bytes:
+        """Первые 4 байта keccak256 от сигнатуры"""
+        if self._selector is None:
+            self._selector = keccak256_bytes(self.signature.encode())[:4]
+        return self._selector
 
+    @property
+    def selector_hex(self) -> str:
+        return "0x" + self.selector.hex()
 
-class ABIEntryFactory:
-    """Фабрика для создания правильного наследника ABIEntry из ABI dict"""
 
-    @staticmethod
-    def create(entry: dict) -> ABIEntry:
-        entry_type = entry.get("type")
-        name = entry.get("name", "")
+def _build_inputs(entry: dict) -> list:
+    return [
+        ABIInput(i.get("name", ""), i["type"], i.get("indexed", False), i.get("components"))
+        for i in entry.get("inputs", ())
+    ]
+
+
+def _build_function(entry: dict) -> FunctionABI:
+    return FunctionABI(
+        entry.get("name", ""), _build_inputs(entry), entry.get("outputs", ()), entry.get("stateMutability", "")
+    )
 
-        inputs = [
-            ABIInput(i.get("name", ""), i["type"], i.get("indexed", False), i.get("components"))
-            for i in entry.get("inputs", [])
-        ]
 
-        outputs = [
-            ABIOutput(o.get("name", ""), o["type"], o.get("components"))
-            for o in entry.get("outputs", [])
-        ] if "outputs" in entry else []
+def _build_event(entry: dict) -> EventABI:
+    return EventABI(entry.get("name", ""), _build_inputs(entry), entry.get("anonymous", False))
 
-        state_mutability = entry.get("stateMutability", "")
 
-        if entry_type == "function":
-            return FunctionABI(name, inputs, outputs, state_mutability)
+def _build_constructor(entry: dict) -> ConstructorABI:
+    return ConstructorABI(_build_inputs(entry), entry.get("stateMutability", ""))
 
-        elif entry_type == "event":
-            return EventABI(name, inputs, entry.get("anonymous", False))
 
-        elif entry_type == "constructor":
-            return ConstructorABI(inputs, state_mutability)
+def _build_error(entry: dict) -> ErrorABI:
+    return ErrorABI(entry.get("name", ""), _build_inputs(entry))
 
-        elif entry_type == "error":
-            return ErrorABI(name, inputs)
 
-        elif entry_type == "fallback":
-            return ABIEntry("", [], "fallback")
+def _build_fallback(entry: dict) -> ABIEntry:
+    return ABIEntry("", [], EntryKind.FALLBACK)
 
-        elif entry_type == "receive":
-            return ABIEntry("", [], "receive")
 
-        return ABIEntry(name, inputs, entry_type)  # запасной вариант
+def _build_receive(entry: dict) -> ABIEntry:
+    return ABIEntry("", [], EntryKind.RECEIVE)
+
+
+def _build_generic(entry: dict) -> ABIEntry:
+    """Запасной вариант для неизвестных типов записей"""
+    return ABIEntry(entry.get("name", ""), _build_inputs(entry), EntryKind.OTHER, entry.get("type"))
+
+
+_BUILDERS = {
+    "function": _build_function,
+    "event": _build_event,
+    "constructor": _build_constructor,
+    "error": _build_error,
+    "fallback": _build_fallback,
+    "receive": _build_receive,
+}
+
+
+class ABIEntryFactory:
+    """Фабрика для создания правильного наследника ABIEntry из ABI dict"""
+
+    @staticmethod
+    def create(entry: dict) -> ABIEntry:
+        return _BUILDERS.get(entry.get("type"), _build_generic)(entry)
 
 
 class Contract:
@@ -222,31 +380,59 @@ class Contract:
         self._fallbacks: List[ABIEntry] = []
         self._receives: List[ABIEntry] = []
         self._errors: Dict[str, ErrorABI] = {}
+        self._selector_index: Dict[bytes, FunctionABI] = {}
 
+        self._abi_raw: list[dict] = abi
         self._parse_abi(abi)
-        self.abi: str = json.dumps(abi)
+
+    @cached_property
+    def abi(self) -> str:
+        """ABI в виде JSON-строки (сериализуется при первом обращении)"""
+        return _json_dumps(self._abi_raw)
 
     def _parse_abi(self, abi: list[dict]) -> None:
-        for raw_entry in abi:
-            abi_entry: ABIEntry = ABIEntryFactory.create(raw_entry)
-            self._entries.append(abi_entry)
-
-            if isinstance(abi_entry, FunctionABI):
-                self._functions[abi_entry.name] = abi_entry
-            elif isinstance(abi_entry, EventABI):
-                self._events[abi_entry.name] = abi_entry
-            elif isinstance(abi_entry, ConstructorABI):
+        # горячий цикл: атрибуты self и методы вынесены в локальные переменные
+        entries = self._entries
+        entries.extend(map(ABIEntryFactory.create, abi))
+
+        functions: List[FunctionABI] = []
+        by_name, events, errors = self._functions, self._events, self._errors
+        for abi_entry in entries:
+            kind = abi_entry.kind
+            if kind is EntryKind.FUNCTION:
+                by_name[abi_entry.name] = abi_entry
+                functions.append(abi_entry)
+            elif kind is EntryKind.EVENT:
+                events[abi_entry.name] = abi_entry
+            elif kind is EntryKind.CONSTRUCTOR:
                 self._constructors.append(abi_entry)
-            elif isinstance(abi_entry, ErrorABI):
-                self._errors[abi_entry.name] = abi_entry
-            elif abi_entry.entry_type == "fallback":
+            elif kind is EntryKind.ERROR:
+                errors[abi_entry.name] = abi_entry
+            elif kind is EntryKind.FALLBACK:
                 self._fallbacks.append(abi_entry)
-            elif abi_entry.entry_type == "receive":
+            elif kind is EntryKind.RECEIVE:
                 self._receives.append(abi_entry)
 
+        # селекторы функций нужны сразу для индекса — хэшируем их одним пакетом
+        digests = keccak256_many(func.signature.encode() for func in functions)
+        index = self._selector_index
+        for func, digest in zip(functions, digests):
+            func._selector = digest[:4]
+            index[func._selector] = func
+
+        # общее пространство имён для доступа через точку; при совпадении имён
+        # приоритет у функций, затем у событий
+        self._members: Dict[str, ABIEntry] = {**self._errors, **self._events, **self._functions}
+
     def get_function(self, name: str) -> Optional["FunctionABI"]:
         return self._functions.get(name)
 
+    def get_function_by_selector(self, selector) -> Optional["FunctionABI"]:
+        """Поиск функции по 4-байтовому селектору (bytes или hex-строка "0x...")"""
+        if isinstance(selector, str):
+            selector = bytes.fromhex(selector[2:] if selector.startswith("0x") else selector)
+        return self._selector_index.get(selector[:4])
+
     def get_event(self, name: str) -> Optional["EventABI"]:
         return self._events.get(name)
 
@@ -261,18 +447,23 @@ class Contract:
 
     def __getattr__(self, name: str) -> ABIEntry:
         """Доступ к функциям/событиям/ошибкам через точку"""
-        if name in self._functions:
-            return self._functions[name]
-        if name in self._events:
-            return self._events[name]
-        if name in self._errors:
-            return self._errors[name]
-        raise AttributeError(f"'{self.name}' contract has no member '{name}'")
+        # читаем через __dict__: до _parse_abi и при распаковке из pickle _members ещё нет
+        attrs = self.__dict__
+        members = attrs.get("_members")
+        if members and name in members:
+            return members[name]
+        raise AttributeError(f"'{attrs.get('name')}' contract has no member '{name}'")
 
     def __repr__(self) -> str:
         return f"<Contract {self.name}: {len(self._functions)} funcs, {len(self._events)}"
 
 
+def _build_contract(item: tuple) -> Contract:
+    """Строит Contract из пары (полное имя, данные solc)"""
+    full_name, data = item
+    return Contract(full_name.split(":")[-1], data.get("abi", []))
+
+
 class ContractCollection:
     """
     Коллекция контрактов из скомпилированных данных.
@@ -280,11 +471,9 @@ class ContractCollection:
     """
 
     def __init__(self, compiled_data):
-        self.contracts = {}
         self.compiled_data = compiled_data
-        for full_name, data in compiled_data.get("contracts", {}).items():
-            contract_name = full_name.split(":")[-1]
-            self.contracts[contract_name] = Contract(contract_name, data.get("abi", []))
+        built = map(_build_contract, compiled_data.get("contracts", {}).items())
+        self.contracts = {contract.name: contract for contract in built}
 
     def __getitem__(self, name):
         """Позволяет получить контракт через collection['MyContract']"""
@@ -295,37 +484,57 @@ class ContractCollection:
 
     def save(self, filename: str):
         """Сохраняет ABI/байткод в JSON"""
+        if orjson is not None:
+            with open(filename, "wb") as f:
+                f.write(orjson.dumps(self.compiled_data, option=orjson.OPT_INDENT_2))
+            return
         with open(filename, "w", encoding="utf-8") as f:
             json.dump(self.compiled_data, f, indent=2, ensure_ascii=False)
 
     @classmethod
     def load(cls, filename: str):
         """Загружает ABI/байткод из JSON"""
-        with open(filename, "r", encoding="utf-8") as f:
-            compiled_data = json.load(f)
+        with open(filename, "rb") as f:
+            compiled_data = _json_loads(f.read())
         return cls(compiled_data)
 
 
 def compile_solidity(sol_file: str, save_json: bool = True) -> dict:
     """
     Компиляция Solidity-контракта через Docker-образ ethereum/solc.
-    Файл копируется во временную папку, которая монтируется в контейнер.
+    Файл связывается жёсткой ссылкой (или копируется) во временную папку,
+    которая монтируется в контейнер только для чтения; вывод solc читается потоком.
     """
     client = docker.from_env()
+    src = Path(sol_file)
+    image = "ethereum/solc:0.8.20"
+    command = ["--combined-json", "abi,bin,metadata", f"/sources/{src.name}"]
 
     with tempfile.TemporaryDirectory() as tmpdir:
-        shutil.copy(Path(sol_file), Path(tmpdir) / sol_file)
-
-        result = client.containers.run(
-            "ethereum/solc:0.8.20",
-            [
-                "--combined-json", "abi,bin,metadata",
-                f"/sources/{sol_file}"
-            ],
-            volumes={tmpdir: {"bind": "/sources", "mode": "rw"}},
-            remove=True
+        dst = Path(tmpdir) / src.name
+        try:
+            os.link(src, dst)
+        except OSError:  # другая файловая система или ссылки не поддерживаются
+            shutil.copy(src, dst)
+
+        container = client.containers.create(
+            image,
+            command,
+            volumes={tmpdir: {"bind": "/sources", "mode": "ro"}},
         )
-    compiled = json.loads(result.decode("utf-8"))
+        try:
+            container.start()
+            output = bytearray()
+            for chunk in container.logs(stdout=True, stderr=False, stream=True, follow=True):
+                output += chunk
+            exit_status = container.wait()["StatusCode"]
+            if exit_status != 0:
+                stderr = container.logs(stdout=False, stderr=True)
+                raise docker.errors.ContainerError(container, exit_status, command, image, stderr)
+        finally:
+            container.remove(force=True)
+
+    compiled = _json_loads(output)
     return ContractCollection(compiled)
 
 
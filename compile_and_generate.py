@@ -8,103 +8,177 @@ Usage:
 """
 
 import argparse
+import functools
+import hashlib
+import io
 import json
 import os
 import re
+import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List
-import hashlib
+from typing import Iterator, List, Optional
 import docker
 import tempfile
-import shutil
+
+try:
+    import orjson
+except ImportError:  # orjson не установлен — используем стандартный json
+    orjson = None
+
+# для ключей кеша криптостойкость не нужна — берём самый быстрый хеш
+try:
+    from blake3 import blake3 as _cache_hash
+except ImportError:
+    _cache_hash = hashlib.blake2b
 
 # ---------- Helpers ----------
 
+# Ethereum использует Keccak-256, а не NIST SHA3-256 из hashlib
+try:
+    from sha3 import keccak_256 as _keccak_256
+except ImportError:
+    from Crypto.Hash import keccak as _keccak
+
+    def _keccak_256(data: bytes = b""):
+        return _keccak.new(data=data, digest_bits=256)
+
 def _keccak256_hex(text: str) -> str:
-    return "0x" + hashlib.sha3_256(text.encode()).hexdigest()
+    return "0x" + _keccak_256(text.encode()).hexdigest()
+
+# одни и те же сигнатуры (Transfer(address,address,uint256), ...) повторяются
+# во многих контрактах проекта — каждая хешируется один раз на процесс
+_signature_hash = functools.lru_cache(maxsize=None)(_keccak256_hex)
+
+def _json_dumps_bytes(obj) -> bytes:
+    """JSON сразу в UTF-8 байтах (orjson не создаёт промежуточную str)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode()
+
+def _json_loads(data):
+    """Разбор JSON из bytes без промежуточного decode"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _write_raw_literal(out: io.BytesIO, data: bytes) -> None:
+    # Python-литерал для JSON-текста без повторного экранирования через repr():
+    # сырая строка в тройных кавычках подходит, если текст не содержит тройных
+    # кавычек и не заканчивается на кавычку или обратный слэш
+    if b'"""' in data or data.endswith((b'"', b"\\")):
+        out.write(repr(data.decode()).encode())
+        return
+    out.write(b'r"""')
+    out.write(data)
+    out.write(b'"""')
 
-def canonical_type(type_str: str, components: List[dict] = None) -> str:
+def _components_key(components: List[dict]) -> tuple:
+    """Хешируемый ключ для components: кортеж пар (type, ключ вложенных components)"""
+    return tuple((c["type"], _components_key(c.get("components") or ())) for c in components)
+
+@functools.lru_cache(maxsize=None)
+def _canonical_type(type_str: str, components_key: tuple) -> str:
     if type_str.startswith("tuple"):
-        inner = ",".join(canonical_type(c["type"], c.get("components")) for c in (components or []))
+        inner = ",".join(_canonical_type(t, k) for t, k in components_key)
         suffix = type_str[5:]
         return f"({inner}){suffix}"
     return type_str
 
+def canonical_type(type_str: str, components: List[dict] = None) -> str:
+    return _canonical_type(type_str, _components_key(components) if components else ())
+
+# скобки tuple убираются до разбора массивов, остальные символы — после
+_TUPLE_TRANS = str.maketrans({"(": None, ")": None, ",": "_"})
+_REST_TRANS = str.maketrans({" ": None, ";": "_", "[": "_", "]": "_", "*": "x", "-": "_"})
+_FIXED_ARRAY_RE = re.compile(r"\[(\d+)\]")
+
+@functools.lru_cache(maxsize=None)
+def _norm_type(t: str) -> str:
+    t = t.translate(_TUPLE_TRANS).replace("[]", "_arr")
+    return _FIXED_ARRAY_RE.sub(r"_arr\1", t).translate(_REST_TRANS)
+
 def method_suffix_from_types(types: List[str]) -> str:
-    def norm(t: str) -> str:
-        t = t.replace("(", "").replace(")", "").replace(",", "_").replace("[]", "_arr")
-        t = re.sub(r"\[(\d+)\]", r"_arr\1", t)
-        t = t.replace(" ", "").replace(";", "_").replace("[", "_").replace("]", "_").replace("*", "x").replace("-", "_")
-        return t
-    return "__" + "_".join(norm(t) for t in types) if types else ""
+    return "__" + "_".join(_norm_type(t) for t in types) if types else ""
 
 # ---------- Templates ----------
 
-HEADER = '''# Auto-generated from ABI. Do not edit.
+HEADER = b'''# Auto-generated from ABI. Do not edit.
 from typing import List, Any
-import hashlib
-
-def _keccak256_hex(text: str) -> str:
-    return "0x" + hashlib.sha3_256(text.encode()).hexdigest()
 '''
 
-CONTRACT_TEMPLATE = '''
-class {class_name}:
-    """Auto-generated helpers for {class_name}."""
-    abi_json: str = {abi_json!r}
+# Шаблоны — функции с f-строками: разбираются один раз при компиляции модуля,
+# а не при каждом вызове, как str.format
 
-    class Functions:
-{functions}
-
-    class Events:
-{events}
+def contract_template(class_name: str) -> str:
+    # литерал abi_json дописывается следом, уже в байтах
+    return (
+        f"\nclass {class_name}:\n"
+        f'    """Auto-generated helpers for {class_name}."""\n'
+        f"    abi_json: str = "
+    )
 
-    class Errors:
-{errors}
-'''
+FUNCTIONS_SECTION = b"\n\n    class Functions:\n"
+EVENTS_SECTION = b"\n\n    class Events:\n"
+ERRORS_SECTION = b"\n\n    class Errors:\n"
 
-FUNCTION_TEMPLATE = '''        class {name}:
-            signature: str = "{sig}"
-            selector: str = _keccak256_hex(signature)
-            inputs: List[str] = {types_repr}
-'''
+def function_template(name: str, sig: str, selector: str, types_repr: List[str]) -> str:
+    return (
+        f"        class {name}:\n"
+        f'            signature: str = "{sig}"\n'
+        f'            selector: str = "{selector}"\n'
+        f"            inputs: List[str] = {types_repr}\n"
+    )
 
-EVENT_TEMPLATE = '''        class {name}:
-            signature: str = "{sig}"
-            topic0: str = _keccak256_hex(signature)
-            inputs: List[str] = {types_repr}
-            indexed: List[bool] = {indexed_list}
-'''
+def event_template(name: str, sig: str, topic0: str, types_repr: List[str], indexed_list: List[bool]) -> str:
+    return (
+        f"        class {name}:\n"
+        f'            signature: str = "{sig}"\n'
+        f'            topic0: str = "{topic0}"\n'
+        f"            inputs: List[str] = {types_repr}\n"
+        f"            indexed: List[bool] = {indexed_list}\n"
+    )
 
-ERROR_TEMPLATE = '''        class {name}:
-            signature: str = "{sig}"
-            selector: str = _keccak256_hex(signature)
-            inputs: List[str] = {types_repr}
-'''
+def error_template(name: str, sig: str, selector: str, types_repr: List[str]) -> str:
+    return (
+        f"        class {name}:\n"
+        f'            signature: str = "{sig}"\n'
+        f'            selector: str = "{selector}"\n'
+        f"            inputs: List[str] = {types_repr}\n"
+    )
 
 # ---------- Generation functions ----------
 
-def generate_functions(entries: List[dict]) -> str:
-    by_name = {}
+def _write_blocks(out: io.BytesIO, blocks: Iterator[str]) -> None:
+    """Пишет блоки классов через пустую строку; пустая секция получает pass"""
+    empty = True
+    for block in blocks:
+        if not empty:
+            out.write(b"\n")
+        out.write(block.encode())
+        empty = False
+    if empty:
+        out.write(b"        pass")
+
+def generate_functions(entries: List[dict]) -> Iterator[str]:
+    counts = Counter(e.get("name", "") for e in entries if e.get("type") == "function")
     for e in entries:
-        if e.get("type") == "function":
-            by_name.setdefault(e.get("name", ""), []).append(e)
-    lines = []
-    for name, overloads in by_name.items():
-        for e in overloads:
-            in_types = [canonical_type(i["type"], i.get("components")) for i in e.get("inputs", [])]
-            sig = f'{name}({",".join(in_types)})'
-            suffix = method_suffix_from_types(in_types) if len(overloads) > 1 else ""
-            py_name = f"{name}{suffix}"
-            lines.append(FUNCTION_TEMPLATE.format(
-                name=py_name,
-                sig=sig,
-                types_repr=in_types
-            ))
-    return "\n".join(lines) if lines else "        pass"
-
-def generate_events(entries: List[dict]) -> str:
-    lines = []
+        if e.get("type") != "function":
+            continue
+        name = e.get("name", "")
+        in_types = [canonical_type(i["type"], i.get("components")) for i in e.get("inputs", [])]
+        sig = f'{name}({",".join(in_types)})'
+        suffix = method_suffix_from_types(in_types) if counts[name] > 1 else ""
+        py_name = f"{name}{suffix}"
+        yield function_template(
+            name=py_name,
+            sig=sig,
+            selector=_signature_hash(sig)[:10],
+            types_repr=in_types
+        )
+
+def generate_events(entries: List[dict]) -> Iterator[str]:
     for e in entries:
         if e.get("type") != "event":
             continue
@@ -112,16 +186,15 @@ def generate_events(entries: List[dict]) -> str:
         in_types = [canonical_type(i["type"], i.get("components")) for i in e.get("inputs", [])]
         sig = f'{name}({",".join(in_types)})'
         indexed_list = [i.get("indexed", False) for i in e.get("inputs", [])]
-        lines.append(EVENT_TEMPLATE.format(
+        yield event_template(
             name=name,
             sig=sig,
+            topic0=_signature_hash(sig),
             types_repr=in_types,
             indexed_list=indexed_list
-        ))
-    return "\n".join(lines) if lines else "        pass"
+        )
 
-def generate_errors(entries: List[dict]) -> str:
-    lines = []
+def generate_errors(entries: List[dict]) -> Iterator[str]:
     for e in entries:
         if e.get("type") != "error":
             continue
@@ -129,42 +202,161 @@ def generate_errors(entries: List[dict]) -> str:
         in_types = [canonical_type(i["type"], i.get("components")) for i in e.get("inputs", [])]
         sig = f'{name}({",".join(in_types)})'
         py_name = f"{name}{method_suffix_from_types(in_types) if in_types else ''}"
-        lines.append(ERROR_TEMPLATE.format(
+        yield error_template(
             name=py_name,
             sig=sig,
+            selector=_signature_hash(sig)[:10],
             types_repr=in_types
-        ))
-    return "\n".join(lines) if lines else "        pass"
-
-def generate_module(abi: List[dict], class_name: str) -> str:
-    return HEADER + CONTRACT_TEMPLATE.format(
-        class_name=class_name,
-        abi_json=json.dumps(abi, ensure_ascii=False),
-        functions=generate_functions(abi),
-        events=generate_events(abi),
-        errors=generate_errors(abi)
-    )
+        )
+
+def generate_module(abi: List[dict], class_name: str) -> bytes:
+    # весь модуль пишется в один байтовый буфер: без промежуточных склеек секций
+    # и без отдельного прохода кодирования перед записью в файл
+    out = io.BytesIO()
+    out.write(HEADER)
+    out.write(contract_template(class_name).encode())
+    _write_raw_literal(out, _json_dumps_bytes(abi))
+    out.write(FUNCTIONS_SECTION)
+    _write_blocks(out, generate_functions(abi))
+    out.write(EVENTS_SECTION)
+    _write_blocks(out, generate_events(abi))
+    out.write(ERRORS_SECTION)
+    _write_blocks(out, generate_errors(abi))
+    out.write(b"\n")
+    return out.getvalue()
 
 # ---------- Solidity compilation ----------
 
-def compile_sol_files(sol_files: List[str]) -> list[dict]:
+SOLC_IMAGE = "ethereum/solc:stable"
+
+# столько файлов solc получает за один запуск контейнера
+SOLC_BATCH_SIZE = 64
+
+# результаты solc кешируются по хешу исходников и id образа компилятора
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "abiparser"
+
+def _solc_image_id(client: docker.DockerClient) -> str:
+    try:
+        return client.images.get(SOLC_IMAGE).id
+    except docker.errors.ImageNotFound:
+        return client.images.pull(SOLC_IMAGE).id
+
+def _sources_digest(sources_dir: Path, sol_names: List[str], image_id: str) -> str:
+    """Хеш всех входных файлов и образа solc: пачка может импортировать файлы других пачек"""
+    h = _cache_hash(image_id.encode())
+    for name in sol_names:
+        data = (sources_dir / name).read_bytes()
+        h.update(f"{name}\0{len(data)}\0".encode())
+        h.update(data)
+    return h.hexdigest()
+
+def _cache_key(sources_digest: str, batch_names: List[str]) -> str:
+    h = _cache_hash(sources_digest.encode())
+    for name in batch_names:
+        h.update(f"{name}\0".encode())
+    return h.hexdigest()
+
+def _stage_file(src: Path, dst: Path) -> None:
+    """Жёсткая ссылка на исходник во временной папке; копия, если ссылку создать нельзя"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:  # другая файловая система или ссылки не поддерживаются
+        shutil.copy(src, dst)
+
+def _compile_batch(
+    client: docker.DockerClient, staged_dir: Path, out_root: Path, sol_names: List[str], out_name: str
+) -> bytes:
+    """
+    Подготовленная во временной папке копия исходников монтируется только для чтения.
+    solc пишет combined.json в отдельную смонтированную директорию, а не в stdout:
+    docker SDK не буферизует весь вывод в памяти.
+    """
+    # директорию создаём сами, чтобы TemporaryDirectory смог её удалить
+    out_dir = out_root / out_name
+    out_dir.mkdir(parents=True)
+    client.containers.run(
+        SOLC_IMAGE,
+        [
+            "--combined-json", "abi,bin,metadata",
+            "-o", f"/out/{out_name}", "--overwrite",
+            *(f"/sources/{name}" for name in sol_names)
+        ],
+        volumes={
+            str(staged_dir): {"bind": "/sources", "mode": "ro"},
+            str(out_root): {"bind": "/out", "mode": "rw"},
+        },
+        remove=True
+    )
+    return (out_dir / "combined.json").read_bytes()
+
+def _compile_batch_cached(
+    client: docker.DockerClient,
+    staged_dir: Path,
+    out_root: Path,
+    sol_names: List[str],
+    out_name: str,
+    cache_dir: Optional[Path],
+    sources_digest: Optional[str],
+) -> dict:
+    """
+    Как _compile_batch, но при неизменных исходниках и образе solc не запускается.
+    solc видит только подготовленные входные файлы, а они все входят в sources_digest.
+    """
+    if cache_dir is None:
+        return _json_loads(_compile_batch(client, staged_dir, out_root, sol_names, out_name))
+
+    cache_file = cache_dir / f"{_cache_key(sources_digest, sol_names)}.json"
+    if cache_file.is_file():
+        return _json_loads(cache_file.read_bytes())
+
+    raw = _compile_batch(client, staged_dir, out_root, sol_names, out_name)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_file.with_suffix(f".{os.getpid()}.{out_name}.tmp")
+    tmp_file.write_bytes(raw)
+    os.replace(tmp_file, cache_file)
+    return _json_loads(raw)
+
+def compile_sol_files(sol_files: List[str], cache_dir: Optional[Path] = DEFAULT_CACHE_DIR) -> list[dict]:
     client = docker.from_env()
     compiled_contracts = []
 
+    # пути относительно общего корня исходников: так во временной папке
+    # сохраняется взаимное расположение файлов и относительные импорты
+    # один и тот же файл может прийти дважды (директория и файл в ней, симлинки)
+    resolved = list(dict.fromkeys(Path(f).resolve() for f in sol_files))
+    sources_dir = Path(os.path.commonpath([p.parent for p in resolved]))
+    sol_names = [p.relative_to(sources_dir).as_posix() for p in resolved]
+
+    sources_digest = None
+    if cache_dir is not None:
+        sources_digest = _sources_digest(sources_dir, sol_names, _solc_image_id(client))
+
     with tempfile.TemporaryDirectory() as tmpdir:
         tmp_path = Path(tmpdir)
-        for f in sol_files:
-            shutil.copy(Path(f), tmp_path / Path(f).name)
-
-        for f in sol_files:
-            sol_name = Path(f).name
-            result = client.containers.run(
-                "ethereum/solc:stable",
-                ["--combined-json", "abi,bin,metadata", f"/sources/{sol_name}"],
-                volumes={str(tmp_path): {"bind": "/sources", "mode": "rw"}},
-                remove=True
+        # монтировать каталог вызывающего нельзя: демон Docker может его не видеть
+        # (в docker-compose общий с хостом только /tmp)
+        staged_dir = tmp_path / "sources"
+        out_root = tmp_path / "out"
+        for p, name in zip(resolved, sol_names):
+            _stage_file(p, staged_dir / name)
+
+        # один запуск solc на пачку файлов; пачки (если их несколько) компилируются
+        # параллельно — время уходит на контейнеры и solc, а не на Python
+        batches = [sol_names[i:i + SOLC_BATCH_SIZE] for i in range(0, len(sol_names), SOLC_BATCH_SIZE)]
+        def run_batch(i: int) -> dict:
+            return _compile_batch_cached(
+                client, staged_dir, out_root, batches[i], str(i), cache_dir, sources_digest
             )
-            compiled = json.loads(result.decode("utf-8"))
+
+        if len(batches) == 1:
+            results = [run_batch(0)]
+        else:
+            workers = min(len(batches), (os.cpu_count() or 1) * 2)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                results = list(ex.map(run_batch, range(len(batches))))
+
+        for compiled in results:
             for full_name, data in compiled.get("contracts", {}).items():
                 contract_name = full_name.split(":")[-1]
                 compiled_contracts.append({
@@ -174,20 +366,64 @@ def compile_sol_files(sol_files: List[str]) -> list[dict]:
                 })
     return compiled_contracts
 
-def collect_sol_files(paths: list[str]) -> list[str]:
+# зависимости, артефакты сборки и служебные директории Hardhat/Foundry/git
+SKIP_DIRS = {"node_modules", "out", "artifacts", "cache", ".git"}
+
+def _walk_sol_files(root: str) -> Iterator[str]:
+    """Обход директории через os.scandir с отсечением SKIP_DIRS и скрытых директорий"""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS and not entry.name.startswith("."):
+                        stack.append(entry.path)
+                elif entry.name.endswith(".sol") and entry.is_file():
+                    yield entry.path
+
+def collect_sol_files(paths: list[str]) -> Iterator[str]:
     """
-    Возвращает список всех Solidity-файлов из переданных путей или директорий,
-    включая поддиректории.
+    Лениво перечисляет Solidity-файлы из переданных путей или директорий,
+    включая поддиректории (кроме SKIP_DIRS и скрытых).
     """
-    sol_files = []
     for p in paths:
         path = Path(p)
         if path.is_dir():
-            # рекурсивно ищем все .sol файлы
-            sol_files.extend([str(f) for f in path.rglob("*.sol")])
+            yield from _walk_sol_files(p)
         elif path.is_file() and path.suffix == ".sol":
-            sol_files.append(str(path))
-    return sol_files
+            yield str(path)
+
+# ---------- Output ----------
+
+# меньше этого числа контрактов пул процессов не окупает запуск и pickle
+PARALLEL_EMIT_THRESHOLD = 16
+
+def _class_name(contract_name: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_]", "_", contract_name)
+
+def _emit_one(contract: dict, out_dir: Path) -> Path:
+    """Генерирует и записывает Python-хелпер одного контракта; выполняется в дочернем процессе"""
+    class_name = _class_name(contract["name"])
+    code = generate_module(contract["abi"], class_name)
+    py_file = out_dir / f"{class_name}_abi.py"
+    py_file.write_bytes(code)
+    return py_file
+
+def emit_modules(compiled_contracts: list[dict], out_dir: Path) -> list[Path]:
+    # одноимённые контракты (интерфейс в нескольких файлах, импорт в нескольких пачках)
+    # пишутся в один файл: оставляем последний, чтобы процессы не писали его одновременно
+    unique = {}
+    for contract in compiled_contracts:
+        class_name = _class_name(contract["name"])
+        unique.pop(class_name, None)
+        unique[class_name] = contract
+    compiled_contracts = list(unique.values())
+
+    # генерация — CPU-bound работа со строками под GIL, поэтому процессы, а не потоки
+    if len(compiled_contracts) < PARALLEL_EMIT_THRESHOLD:
+        return [_emit_one(contract, out_dir) for contract in compiled_contracts]
+    with ProcessPoolExecutor() as ex:
+        return list(ex.map(_emit_one, compiled_contracts, [out_dir] * len(compiled_contracts)))
 
 # ---------- CLI ----------
 
@@ -196,29 +432,27 @@ def main():
     # parser.add_argument("sol_files", nargs="+", help="Solidity files to compile")
     parser.add_argument("paths", nargs="+", help="Solidity files or directories to compile")
     parser.add_argument("-o", "--out", type=Path, default=Path("."), help="Output directory")
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR, help="Directory for cached solc output")
+    parser.add_argument("--no-cache", action="store_true", help="Always run solc, ignoring the cache")
     args = parser.parse_args()
 
     out_dir = args.out
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    sol_files = collect_sol_files(args.paths)
+    sol_files = list(collect_sol_files(args.paths))
     if not sol_files:
         print("No Solidity files found in the provided paths.")
         return
 
     print(f"Found Solidity files: {sol_files}")
 
-    compiled_contracts = compile_sol_files(sol_files)
+    compiled_contracts = compile_sol_files(sol_files, None if args.no_cache else args.cache_dir)
     # json_path = out_dir / "compiled_contracts.json"
     # json_path.write_text(json.dumps(compiled_contracts, indent=2, ensure_ascii=False), encoding="utf-8")
     # print(f"Saved compiled contracts to {json_path}")
 
     # generate Python files
-    for contract in compiled_contracts:
-        class_name = re.sub(r"[^0-9A-Za-z_]", "_", contract["name"])
-        code = generate_module(contract["abi"], class_name)
-        py_file = out_dir / f"{class_name}_abi.py"
-        py_file.write_text(code, encoding="utf-8")
+    for py_file in emit_modules(compiled_contracts, out_dir):
         print(f"Generated Python helper: {py_file}")
 
 if __name__ == "__main__":